@@ -234,7 +234,8 @@ class ChatEngine(BaseChatEngine):
             )
         else:
             response = cast(ChatResponse, llm_response)
-            response.debug_info = debug_info
+            # Keep the LLM's own debug info, e.g. the number of cached prompt tokens
+            response.debug_info.update(debug_info)
             return response
 
     def _get_context(self,
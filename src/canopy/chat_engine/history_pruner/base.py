@@ -35,6 +35,10 @@ class HistoryPruner(ABC, ConfigurableMixin):
             )
 
         if context is not None:
-            max_tokens -= context.num_tokens
+            # The LLM sends the context as a separate "Context: ..." system message,
+            # so its message overhead and prefix are counted on top of the content
+            max_tokens -= context.num_tokens + self._tokenizer.messages_token_count(
+                [SystemMessage(content="Context: ")]
+            )
 
         return max_tokens
@@ -1,4 +1,5 @@
 from .base import BaseLLM
+from .cache import LLMCache
 from .openai import OpenAILLM
 from .anyscale import AnyscaleLLM
 from .azure_openai_llm import AzureOpenAILLM
@@ -4,6 +4,8 @@ from typing import Optional, Any
 import openai
 
 from canopy.llm import OpenAILLM
+from canopy.llm.openai import _get_http_client, _get_async_http_client
+from canopy.llm.cache import LLMCache
 
 
 class AzureOpenAILLM(OpenAILLM):
@@ -27,6 +29,7 @@ class AzureOpenAILLM(OpenAILLM):
                  api_key: Optional[str] = None,
                  api_version: str = "2023-12-01-preview",
                  azure_endpoint: Optional[str] = None,
+                 cache: Optional[LLMCache] = None,
                  **kwargs: Any,
                  ):
         """
@@ -37,6 +40,7 @@ class AzureOpenAILLM(OpenAILLM):
             api_key: Your Azure OpenAI API key. Defaults to None (uses the "AZURE_OPENAI_API_KEY" environment variable).
             api_version: The Azure OpenAI API version to use. Defaults to "2023-12-01-preview".
             azure_endpoint: The url of your Azure OpenAI service endpoint. Defaults to None (uses the "AZURE_OPENAI_ENDPOINT" environment variable).
+            cache: An optional LLMCache for responses to requests with `temperature=0`. Defaults to None (no caching).
             **kwargs: Generation default parameters to use for each request.
 
 
@@ -48,13 +52,17 @@ class AzureOpenAILLM(OpenAILLM):
 
         """  # noqa: E501
         self.model_name = model_name
+        self._client_params = dict(
+            azure_deployment=model_name,
+            api_key=api_key,
+            api_version=api_version,
+            azure_endpoint=azure_endpoint,
+        )
 
         try:
             self._client = openai.AzureOpenAI(
-                azure_deployment=model_name,
-                api_key=api_key,
-                api_version=api_version,
-                azure_endpoint=azure_endpoint,  # type: ignore
+                **self._client_params,  # type: ignore
+                http_client=_get_http_client(azure_endpoint),
             )
         except (openai.OpenAIError, ValueError) as e:
             raise RuntimeError(
@@ -63,6 +71,8 @@ class AzureOpenAILLM(OpenAILLM):
                 "are set correctly. "
                 f"Underlying Error:\n{self._format_openai_error(e)}"
             ) from e
+        self._aclients = {}
+        self._cache = cache
 
         self.default_model_params = kwargs
 
@@ -72,6 +82,11 @@ class AzureOpenAILLM(OpenAILLM):
             "Azure OpenAI LLM does not support listing available models"
         )
 
+    def _create_async_client(self) -> openai.AsyncAzureOpenAI:
+        http_client = _get_async_http_client(self._client_params["azure_endpoint"])
+        return openai.AsyncAzureOpenAI(**self._client_params,  # type: ignore
+                                       http_client=http_client)
+
     def _handle_chat_error(self, e):
         if isinstance(e, openai.AuthenticationError):
             raise RuntimeError(
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Union, Iterable, Optional
+from typing import Union, Iterable, AsyncIterable, Optional
 
 from canopy.llm.models import Function
 from canopy.models.api_models import ChatResponse, StreamingChatChunk
@@ -45,7 +45,7 @@ class BaseLLM(ABC, ConfigurableMixin):
                                max_generated_tokens: Optional[int] = None,
                                model_params: Optional[dict] = None,
                                ) -> Union[ChatResponse,
-                                          Iterable[StreamingChatChunk]]:
+                                          AsyncIterable[StreamingChatChunk]]:
         pass
 
     @abstractmethod
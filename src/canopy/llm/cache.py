@@ -0,0 +1,79 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+
+
+class LLMCache:
+    """
+    In-memory LRU cache for deterministic LLM responses.
+
+    The cache is opt-in: pass an instance to an LLM (e.g. `OpenAILLM(cache=LLMCache())`)
+    and identical requests sent with `temperature=0` will be answered from the cache
+    instead of calling the provider's API again. Streaming requests are never cached.
+
+    The LLMs store their responses as bytes. To use a different storage backend
+    (e.g. Redis or a file), subclass `LLMCache` and override `get` and `set`.
+    """  # noqa: E501
+
+    def __init__(self,
+                 max_size: int = 1024,
+                 ttl: Optional[float] = 3600):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries to keep. The least recently used entry is evicted when the cache is full. Defaults to 1024.
+            ttl: Default time to live of each entry, in seconds. Defaults to 3600. Set to None for entries that never expire.
+        """  # noqa: E501
+        if max_size <= 0:
+            raise ValueError("max_size must be a positive integer")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def make_key(**payload: Any) -> str:
+        serialized = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.sha256(serialized).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self._hits, "misses": self._misses}
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,20 +1,322 @@
-from copy import deepcopy
-from typing import Union, Iterable, Optional, Any, Dict, cast
-
+import asyncio
+import importlib.util
+import random
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import (Union, Iterable, Iterator, AsyncIterable, AsyncIterator,
+                    Awaitable, Callable, Optional, Any, Dict, List, Tuple, cast)
+
+import httpx
 import jsonschema
 import openai
+import orjson
 import json
 
-from openai.types.chat import ChatCompletionToolParam
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    retry_if_exception_type,
-)
+from jsonschema.protocols import Validator
+from openai import AsyncStream
+from openai.types.chat import (ChatCompletionToolParam, ChatCompletionMessageParam,
+                               ChatCompletionChunk)
+
 from canopy.llm import BaseLLM
+from canopy.llm.cache import LLMCache
 from canopy.llm.models import Function
-from canopy.models.api_models import ChatResponse, StreamingChatChunk
-from canopy.models.data_models import Messages, Context, SystemMessage
+from canopy.models.api_models import (ChatResponse, StreamingChatChunk,
+                                      _StreamChoice)
+from canopy.models.data_models import (Messages, MessageBase, Context,
+                                       SystemMessage)
+
+
+# Time, in seconds, for which the list of available models is cached
+AVAILABLE_MODELS_TTL = 300
+
+# HTTP/2 is used when the optional `h2` package is installed (`http2` extra)
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_HTTP_CLIENT_LIMITS = httpx.Limits(max_connections=256,
+                                   max_keepalive_connections=128)
+
+
+class _SharedHttpClient(httpx.Client):
+    """
+    An httpx.Client shared between LLM instances. Closing it through one of the
+    OpenAI clients that use it (e.g. `llm._client.close()`) is a no-op, since the
+    other instances still rely on it.
+    """
+
+    def close(self) -> None:
+        pass
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+
+class _SharedAsyncHttpClient(httpx.AsyncClient):
+    """
+    The async counterpart of `_SharedHttpClient`.
+    """
+
+    async def aclose(self) -> None:
+        pass
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+
+# HTTP clients are shared by all the LLM instances that target the same base URL, so
+# that connections are pooled process-wide instead of per instance. Async clients
+# are bound to the event loop they are used in, so they are also keyed by loop.
+_http_clients: Dict[Optional[str], httpx.Client] = {}
+# Each loop's entry also holds the generator that closes its clients on shutdown
+_async_http_clients: Dict[asyncio.AbstractEventLoop, Tuple[Dict[Optional[str], httpx.AsyncClient], AsyncIterator[None]]] = {}  # noqa: E501
+_http_clients_lock = threading.Lock()
+
+
+def _drop_closed_loops(clients: Dict[asyncio.AbstractEventLoop, Any]) -> None:
+    # The clients reference their loop (through their connections), so the entries
+    # of closed loops are dropped explicitly instead of relying on weak references
+    for loop in [loop for loop in clients if loop.is_closed()]:
+        del clients[loop]
+
+
+async def _close_on_loop_shutdown(loop: asyncio.AbstractEventLoop
+                                  ) -> AsyncIterator[None]:
+    # A loop closes its async generators in `shutdown_asyncgens()`, which is called
+    # by `asyncio.run()` before the loop is closed. The loop's HTTP clients have to
+    # be closed at that point, while their connections can still be closed on it.
+    try:
+        yield
+    finally:
+        with _http_clients_lock:
+            loop_clients, _ = _async_http_clients.pop(loop, ({}, None))
+        for client in loop_clients.values():
+            # Bypass the no-op `aclose` of the shared client
+            await httpx.AsyncClient.aclose(client)
+
+
+def _get_http_client(base_url: Optional[str]) -> httpx.Client:
+    with _http_clients_lock:
+        client = _http_clients.get(base_url)
+        if client is None:
+            client = _SharedHttpClient(http2=_HTTP2_AVAILABLE,
+                                       limits=_HTTP_CLIENT_LIMITS,
+                                       timeout=openai.DEFAULT_TIMEOUT,
+                                       follow_redirects=True)
+            _http_clients[base_url] = client
+        return client
+
+
+def _get_async_http_client(base_url: Optional[str]) -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    with _http_clients_lock:
+        # Loops closed without `shutdown_asyncgens()` can no longer close their
+        # clients' connections, so their clients are only released
+        _drop_closed_loops(_async_http_clients)
+        if loop not in _async_http_clients:
+            # The generator is kept in the entry since the loop only holds a weak
+            # reference to it, and started so that it is registered on the loop
+            shutdown_watcher = _close_on_loop_shutdown(loop)
+            asyncio.ensure_future(shutdown_watcher.__anext__())
+            _async_http_clients[loop] = ({}, shutdown_watcher)
+        loop_clients, _ = _async_http_clients[loop]
+        client = loop_clients.get(base_url)
+        if client is None:
+            client = _SharedAsyncHttpClient(http2=_HTTP2_AVAILABLE,
+                                            limits=_HTTP_CLIENT_LIMITS,
+                                            timeout=openai.DEFAULT_TIMEOUT,
+                                            follow_redirects=True)
+            loop_clients[base_url] = client
+        return client
+
+
+# Retry policy for enforced function calls, in case the model's response is not a
+# valid JSON or does not match the function's schema
+FUNCTION_CALL_MAX_ATTEMPTS = 3
+_FUNCTION_CALL_RETRY_ERRORS = (json.decoder.JSONDecodeError,
+                               jsonschema.ValidationError)
+
+
+def _retry_delay(attempt: int) -> float:
+    # Exponential backoff, capped at 2 seconds, with a small random jitter
+    return min(2.0, 0.1 * 2 ** attempt) + random.uniform(0, 0.05)
+
+
+def _call_with_retry(attempt_fn: Callable[[], dict]) -> dict:
+    for attempt in range(FUNCTION_CALL_MAX_ATTEMPTS - 1):
+        try:
+            return attempt_fn()
+        except _FUNCTION_CALL_RETRY_ERRORS:
+            time.sleep(_retry_delay(attempt))
+    return attempt_fn()
+
+
+async def _acall_with_retry(attempt_fn: Callable[[], Awaitable[dict]]) -> dict:
+    for attempt in range(FUNCTION_CALL_MAX_ATTEMPTS - 1):
+        try:
+            return await attempt_fn()
+        except _FUNCTION_CALL_RETRY_ERRORS:
+            await asyncio.sleep(_retry_delay(attempt))
+    return await attempt_fn()
+
+
+@lru_cache(maxsize=128)
+def _get_function_call_params(function_json: bytes
+                              ) -> Tuple[Dict[str, Any], Validator]:
+    # The tool params and the arguments' validator only depend on the function, so
+    # both are built once per distinct function and shared between calls
+    function = orjson.loads(function_json)
+    tool_params = dict(tools=[cast(ChatCompletionToolParam,
+                                   {"type": "function", "function": function})],
+                       tool_choice={"type": "function",
+                                    "function": {"name": function["name"]}})
+    schema = function["parameters"]
+    validator_cls = jsonschema.validators.validator_for(schema)
+    validator_cls.check_schema(schema)
+    return tool_params, validator_cls(schema)
+
+
+def _message_dict(message: MessageBase) -> dict:
+    # The chat history mostly grows append-only between turns, so the serialized form
+    # of each message is cached on it and reused as long as it was not modified.
+    cached = message._serialized
+    if (cached is None
+            or cached[0] is not message.role
+            or cached[1] is not message.content):
+        cached = (message.role, message.content, message.dict())
+        message._serialized = cached
+    return dict(cached[2])
+
+
+def _parse_streaming_chunk(chunk: Any) -> StreamingChatChunk:
+    # Chunks are already validated by the OpenAI client, so the canopy model is built
+    # directly instead of being validated again for every streamed token.
+    return StreamingChatChunk.construct(
+        id=chunk.id,
+        object=chunk.object,
+        created=chunk.created,
+        model=chunk.model,
+        choices=[_StreamChoice.construct(index=choice.index,
+                                         delta=dict(choice.delta),
+                                         finish_reason=choice.finish_reason)
+                 for choice in chunk.choices],
+    )
+
+
+class _ChunkCoalescer:
+    """
+    Merges consecutive streaming chunks, so that a single StreamingChatChunk is parsed
+    and yielded per flush instead of one per token.
+
+    The buffer is flushed once it spans more than `coalesce_ms` milliseconds or holds
+    at least `coalesce_chars` characters of content. Chunks that carry anything other
+    than a role or content delta (e.g. tool calls) are never merged.
+    """
+
+    _MERGEABLE_DELTA_FIELDS = {"role", "content"}
+
+    def __init__(self, coalesce_ms: int, coalesce_chars: int):
+        self._coalesce_ms = coalesce_ms
+        self._coalesce_chars = coalesce_chars
+        self._buffer: List[Any] = []
+        self._buffer_start = 0.0
+        self._buffer_chars = 0
+
+    def push(self, chunk: Any) -> List[StreamingChatChunk]:
+        if not self._is_mergeable(chunk):
+            return self.flush() + [_parse_streaming_chunk(chunk)]
+
+        if not self._buffer:
+            self._buffer_start = time.monotonic()
+        self._buffer.append(chunk)
+        self._buffer_chars += sum(len(choice.delta.content or "")
+                                  for choice in chunk.choices)
+
+        if self._coalesce_chars and self._buffer_chars >= self._coalesce_chars:
+            return self.flush()
+        elapsed_ms = (time.monotonic() - self._buffer_start) * 1000
+        if self._coalesce_ms and elapsed_ms >= self._coalesce_ms:
+            return self.flush()
+        return []
+
+    def flush(self) -> List[StreamingChatChunk]:
+        if not self._buffer:
+            return []
+
+        choices: Dict[int, Dict[str, Any]] = {}
+        contents: Dict[int, List[str]] = {}
+        for chunk in self._buffer:
+            for choice in chunk.choices:
+                # The merged delta has the same keys as an uncoalesced one, with
+                # None for the fields that were not set
+                merged = choices.setdefault(
+                    choice.index,
+                    {"index": choice.index,
+                     "delta": dict.fromkeys(dict(choice.delta)),
+                     "finish_reason": None}
+                )
+                if merged["delta"]["role"] is None:
+                    merged["delta"]["role"] = choice.delta.role
+                if choice.delta.content is not None:
+                    contents.setdefault(choice.index, []).append(choice.delta.content)
+                if choice.finish_reason is not None:
+                    merged["finish_reason"] = choice.finish_reason
+        for index, content in contents.items():
+            choices[index]["delta"]["content"] = "".join(content)
+
+        last = self._buffer[-1]
+        self._buffer = []
+        self._buffer_chars = 0
+        return [StreamingChatChunk.construct(
+            id=last.id,
+            object=last.object,
+            created=last.created,
+            model=last.model,
+            choices=[_StreamChoice.construct(**choice) for choice in choices.values()],
+        )]
+
+    @classmethod
+    def _is_mergeable(cls, chunk: Any) -> bool:
+        for choice in chunk.choices:
+            delta_fields = {name for name, value in dict(choice.delta).items()
+                            if value is not None}
+            if not delta_fields <= cls._MERGEABLE_DELTA_FIELDS:
+                return False
+        return True
+
+
+def _streaming_iterator(response: Iterable[Any],
+                        *,
+                        coalesce_ms: int = 0,
+                        coalesce_chars: int = 0,
+                        ) -> Iterator[StreamingChatChunk]:
+    if not coalesce_ms and not coalesce_chars:
+        for chunk in response:
+            yield _parse_streaming_chunk(chunk)
+        return
+
+    coalescer = _ChunkCoalescer(coalesce_ms, coalesce_chars)
+    for chunk in response:
+        yield from coalescer.push(chunk)
+    yield from coalescer.flush()
+
+
+async def _astreaming_iterator(response: AsyncIterable[Any],
+                               *,
+                               coalesce_ms: int = 0,
+                               coalesce_chars: int = 0,
+                               ) -> AsyncIterator[StreamingChatChunk]:
+    if not coalesce_ms and not coalesce_chars:
+        async for chunk in response:
+            yield _parse_streaming_chunk(chunk)
+        return
+
+    coalescer = _ChunkCoalescer(coalesce_ms, coalesce_chars)
+    async for chunk in response:
+        for coalesced_chunk in coalescer.push(chunk):
+            yield coalesced_chunk
+    for coalesced_chunk in coalescer.flush():
+        yield coalesced_chunk
 
 
 class OpenAILLM(BaseLLM):
@@ -34,6 +336,7 @@ class OpenAILLM(BaseLLM):
                  api_key: Optional[str] = None,
                  organization: Optional[str] = None,
                  base_url: Optional[str] = None,
+                 cache: Optional[LLMCache] = None,
                  **kwargs: Any,
                  ):
         """
@@ -44,21 +347,29 @@ class OpenAILLM(BaseLLM):
             api_key: Your OpenAI API key. Defaults to None (uses the "OPENAI_API_KEY" environment variable).
             organization: Your OpenAI organization. Defaults to None (uses the "OPENAI_ORG" environment variable if set, otherwise uses the "default" organization).
             base_url: The base URL to use for the OpenAI API. Defaults to None (uses the default OpenAI API URL).
+            cache: An optional LLMCache. If set, responses to requests with `temperature=0` are cached and repeated identical requests are served from the cache. Defaults to None (no caching).
             **kwargs: Generation default parameters to use for each request. See https://platform.openai.com/docs/api-reference/chat/create
                     For example, you can set the temperature, top_p etc
                     These params can be overridden by passing a `model_params` argument to the `chat_completion` or `enforced_function_call` methods.
         """  # noqa: E501
         super().__init__(model_name)
+        self._client_params: Dict[str, Any] = dict(api_key=api_key,
+                                                   organization=organization,
+                                                   base_url=base_url)
         try:
-            self._client = openai.OpenAI(api_key=api_key,
-                                         organization=organization,
-                                         base_url=base_url)
+            self._client = openai.OpenAI(**self._client_params,
+                                         http_client=_get_http_client(base_url))
         except openai.OpenAIError as e:
             raise RuntimeError(
                 "Failed to connect to OpenAI, please make sure that the OPENAI_API_KEY "
                 "environment variable is set correctly.\n"
                 f"Error: {self._format_openai_error(e)}"
             )
+        # Async clients are created on first use in each event loop, since they
+        # cannot be shared between loops
+        self._aclients: Dict[asyncio.AbstractEventLoop, openai.AsyncOpenAI] = {}
+        self._cache = cache
+        self._models_cache: Optional[Tuple[float, List[str]]] = None
 
         self.default_model_params = kwargs
         if "model" in self.default_model_params:
@@ -69,7 +380,27 @@ class OpenAILLM(BaseLLM):
 
     @property
     def available_models(self):
-        return [k.id for k in self._client.models.list()]
+        now = time.monotonic()
+        if (self._models_cache is None
+                or now - self._models_cache[0] >= AVAILABLE_MODELS_TTL):
+            self._models_cache = (now, [k.id for k in self._client.models.list()])
+        return list(self._models_cache[1])
+
+    @property
+    def _async_client(self) -> openai.AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        client = self._aclients.get(loop)
+        if client is None:
+            # The clients of closed loops only wrap shared HTTP clients, which are
+            # closed when their loop shuts down
+            _drop_closed_loops(self._aclients)
+            client = self._create_async_client()
+            self._aclients[loop] = client
+        return client
+
+    def _create_async_client(self) -> openai.AsyncOpenAI:
+        http_client = _get_async_http_client(self._client_params["base_url"])
+        return openai.AsyncOpenAI(**self._client_params, http_client=http_client)
 
     def chat_completion(self,
                         system_prompt: str,
@@ -79,12 +410,18 @@ class OpenAILLM(BaseLLM):
                         stream: bool = False,
                         max_tokens: Optional[int] = None,
                         model_params: Optional[dict] = None,
+                        coalesce_ms: int = 0,
+                        coalesce_chars: int = 0,
                         ) -> Union[ChatResponse, Iterable[StreamingChatChunk]]:
         """
         Chat completion using the OpenAI API.
 
         Note: this function is wrapped in a retry decorator to handle transient errors.
 
+        Note: the system prompt and the context are sent as separate messages. Keep the `system_prompt` identical across
+              requests to benefit from OpenAI's automatic prompt caching. The number of cached prompt tokens, when reported
+              by the API, is available in the response's `debug_info["cached_prompt_tokens"]`.
+
         Args:
             system_prompt: The system prompt to use for the chat completion.
             chat_history: Chat history to use for the chat completion as list of messages.
@@ -95,6 +432,8 @@ class OpenAILLM(BaseLLM):
                           Dictonary of parameters to override the default model parameters if set on initialization.
                           For example, you can pass: {"temperature": 0.9, "top_p": 1.0} to override the default temperature and top_p.
                           see: https://platform.openai.com/docs/api-reference/chat/create
+            coalesce_ms: Only used when streaming. Merge consecutive chunks arriving within this many milliseconds into a single chunk. Defaults to 0 (every chunk is yielded as is).
+            coalesce_chars: Only used when streaming. Yield a merged chunk as soon as it holds at least this many characters of content. Defaults to 0 (no limit).
         Returns:
             ChatResponse or StreamingChatChunk
 
@@ -110,19 +449,19 @@ class OpenAILLM(BaseLLM):
             "roses are red"
         """  # noqa: E501
 
-        model_params_dict: Dict[str, Any] = deepcopy(self.default_model_params)
-        model_params_dict.update(model_params or {})
-        if max_tokens is not None:
-            model_params_dict["max_tokens"] = max_tokens
+        model, messages, model_params_dict = self._build_request(system_prompt,
+                                                                 chat_history,
+                                                                 context,
+                                                                 max_tokens,
+                                                                 model_params)
+        cache_key = None if stream else self._get_cache_key(model,
+                                                            messages,
+                                                            model_params_dict)
+        if cache_key is not None:
+            cached = self._cache.get(cache_key)  # type: ignore
+            if cached is not None:
+                return ChatResponse.parse_obj(orjson.loads(zlib.decompress(cached)))
 
-        model = model_params_dict.pop("model", self.model_name)
-
-        if context is None:
-            system_message = system_prompt
-        else:
-            system_message = system_prompt + f"\nContext: {context.to_text()}"
-        messages = [SystemMessage(content=system_message).dict()
-                    ] + [m.dict() for m in chat_history]
         try:
             response = self._client.chat.completions.create(model=model,
                                                             messages=messages,
@@ -131,23 +470,18 @@ class OpenAILLM(BaseLLM):
         except openai.OpenAIError as e:
             self._handle_chat_error(e)
 
-        def streaming_iterator(response):
-            for chunk in response:
-                yield StreamingChatChunk.parse_obj(chunk)
-
         if stream:
-            return streaming_iterator(response)
+            return _streaming_iterator(response,
+                                       coalesce_ms=coalesce_ms,
+                                       coalesce_chars=coalesce_chars)
 
-        return ChatResponse.parse_obj(response)
+        chat_response = self._parse_chat_response(response)
+        if cache_key is not None:
+            # Responses are stored compressed, as bytes that any cache backend can hold
+            self._cache.set(cache_key,  # type: ignore
+                            zlib.compress(orjson.dumps(chat_response.dict())))
+        return chat_response
 
-    @retry(
-        reraise=True,
-        stop=stop_after_attempt(3),
-        retry=retry_if_exception_type(
-            (json.decoder.JSONDecodeError,
-             jsonschema.ValidationError)
-        ),
-    )
     def enforced_function_call(self,
                                system_prompt: str,
                                chat_history: Messages,
@@ -160,7 +494,7 @@ class OpenAILLM(BaseLLM):
 
         To read more about this feature, see: https://platform.openai.com/docs/guides/gpt/function-calling
 
-        Note: this function is wrapped in a retry decorator to handle transient errors.
+        Note: the API call is retried, with exponential backoff, up to 3 times if the model's response is not a valid JSON or does not match the function's schema.
 
         Args:
             system_prompt: The system prompt to use for the chat completion.
@@ -198,35 +532,38 @@ class OpenAILLM(BaseLLM):
             {'queries': ['capital of France']}
         """  # noqa: E501
 
-        model_params_dict: Dict[str, Any] = deepcopy(self.default_model_params)
-        model_params_dict.update(model_params or {})
-        if max_tokens is not None:
-            model_params_dict["max_tokens"] = max_tokens
-
-        model = model_params_dict.pop("model", self.model_name)
-
-        function_dict = cast(ChatCompletionToolParam,
-                             {"type": "function", "function": function.dict()})
-
-        messages = [SystemMessage(content=system_prompt).dict()
-                    ] + [m.dict() for m in chat_history]
-        try:
-            chat_completion = self._client.chat.completions.create(
-                model=model,
-                messages=messages,
-                tools=[function_dict],
-                tool_choice={"type": "function",
-                             "function": {"name": function.name}},
-                max_tokens=max_tokens,
-                **model_params_dict
-            )
-        except openai.OpenAIError as e:
-            self._handle_chat_error(e)
-
-        result = chat_completion.choices[0].message.tool_calls[0].function.arguments
-        arguments = json.loads(result)
-
-        jsonschema.validate(instance=arguments, schema=function.parameters.dict())
+        model, messages, model_params_dict = self._build_request(system_prompt,
+                                                                 chat_history,
+                                                                 None,
+                                                                 max_tokens,
+                                                                 model_params)
+        tool_params, validator = self._function_call_params(function)
+        cache_key = self._get_cache_key(model,
+                                        messages,
+                                        model_params_dict,
+                                        **tool_params)
+        if cache_key is not None:
+            cached = self._cache.get(cache_key)  # type: ignore
+            if cached is not None:
+                return orjson.loads(cached)
+
+        # Only the API call and the parsing of its result are retried, the request
+        # itself is built once
+        def _attempt() -> dict:
+            try:
+                chat_completion = self._client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    **tool_params,
+                    **model_params_dict
+                )
+            except openai.OpenAIError as e:
+                self._handle_chat_error(e)
+            return self._parse_function_call(chat_completion, validator)
+
+        arguments = _call_with_retry(_attempt)
+        if cache_key is not None:
+            self._cache.set(cache_key, orjson.dumps(arguments))  # type: ignore
         return arguments
 
     async def achat_completion(self,
@@ -237,17 +574,188 @@ class OpenAILLM(BaseLLM):
                                stream: bool = False,
                                max_generated_tokens: Optional[int] = None,
                                model_params: Optional[dict] = None,
+                               coalesce_ms: int = 0,
+                               coalesce_chars: int = 0,
                                ) -> Union[ChatResponse,
-                                          Iterable[StreamingChatChunk]]:
-        raise NotImplementedError()
+                                          AsyncIterable[StreamingChatChunk]]:
+        """
+        Async version of `chat_completion`, using the OpenAI async client.
+
+        See `chat_completion` for the full description of the arguments.
+
+        Args:
+            system_prompt: The system prompt to use for the chat completion.
+            chat_history: Chat history to use for the chat completion as list of messages.
+            context: Knowledge base context to use for the chat completion. Defaults to None (no context).
+            stream: Whether to stream the response or not.
+            max_generated_tokens: Maximum number of tokens to generate. Defaults to None (generates until stop sequence or until hitting max context size).
+            model_params: Model parameters to use for this request. Defaults to None (uses the default model parameters).
+            coalesce_ms: Only used when streaming. Merge consecutive chunks arriving within this many milliseconds into a single chunk. Defaults to 0 (every chunk is yielded as is).
+            coalesce_chars: Only used when streaming. Yield a merged chunk as soon as it holds at least this many characters of content. Defaults to 0 (no limit).
+
+        Returns:
+            ChatResponse or an async iterable of StreamingChatChunk
+        """  # noqa: E501
+        model, messages, model_params_dict = self._build_request(system_prompt,
+                                                                 chat_history,
+                                                                 context,
+                                                                 max_generated_tokens,
+                                                                 model_params)
+        cache_key = None if stream else self._get_cache_key(model,
+                                                            messages,
+                                                            model_params_dict)
+        if cache_key is not None:
+            cached = self._cache.get(cache_key)  # type: ignore
+            if cached is not None:
+                return ChatResponse.parse_obj(orjson.loads(zlib.decompress(cached)))
+
+        try:
+            response = await self._async_client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=stream,
+                **model_params_dict
+            )
+        except openai.OpenAIError as e:
+            self._handle_chat_error(e)
+
+        if stream:
+            return _astreaming_iterator(cast(AsyncStream[ChatCompletionChunk],
+                                             response),
+                                        coalesce_ms=coalesce_ms,
+                                        coalesce_chars=coalesce_chars)
+
+        chat_response = self._parse_chat_response(response)
+        if cache_key is not None:
+            # Responses are stored compressed, as bytes that any cache backend can hold
+            self._cache.set(cache_key,  # type: ignore
+                            zlib.compress(orjson.dumps(chat_response.dict())))
+        return chat_response
 
     async def aenforced_function_call(self,
                                       system_prompt: str,
                                       chat_history: Messages,
                                       function: Function, *,
                                       max_tokens: Optional[int] = None,
-                                      model_params: Optional[dict] = None):
-        raise NotImplementedError()
+                                      model_params: Optional[dict] = None) -> dict:
+        """
+        Async version of `enforced_function_call`, using the OpenAI async client.
+
+        See `enforced_function_call` for the full description of the arguments.
+
+        Args:
+            system_prompt: The system prompt to use for the chat completion.
+            chat_history: Messages (chat history) to send to the model.
+            function: Function to call. See canopy.llm.models.Function for more details.
+            max_tokens: Maximum number of tokens to generate. Defaults to None (generates until stop sequence or until hitting max context size).
+            model_params: Model parameters to use for this request. Defaults to None (uses the default model parameters).
+
+        Returns:
+            dict: Function call arguments as a dictionary.
+        """  # noqa: E501
+        model, messages, model_params_dict = self._build_request(system_prompt,
+                                                                 chat_history,
+                                                                 None,
+                                                                 max_tokens,
+                                                                 model_params)
+        tool_params, validator = self._function_call_params(function)
+        cache_key = self._get_cache_key(model,
+                                        messages,
+                                        model_params_dict,
+                                        **tool_params)
+        if cache_key is not None:
+            cached = self._cache.get(cache_key)  # type: ignore
+            if cached is not None:
+                return orjson.loads(cached)
+
+        # Only the API call and the parsing of its result are retried, the request
+        # itself is built once
+        async def _attempt() -> dict:
+            try:
+                chat_completion = await self._async_client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    **tool_params,
+                    **model_params_dict
+                )
+            except openai.OpenAIError as e:
+                self._handle_chat_error(e)
+            return self._parse_function_call(chat_completion, validator)
+
+        arguments = await _acall_with_retry(_attempt)
+        if cache_key is not None:
+            self._cache.set(cache_key, orjson.dumps(arguments))  # type: ignore
+        return arguments
+
+    def _build_request(self,
+                       system_prompt: str,
+                       chat_history: Messages,
+                       context: Optional[Context],
+                       max_tokens: Optional[int],
+                       model_params: Optional[dict],
+                       ) -> Tuple[str,
+                                  List[ChatCompletionMessageParam],
+                                  Dict[str, Any]]:
+        model_params_dict: Dict[str, Any] = {**self.default_model_params,
+                                             **(model_params or {})}
+        if max_tokens is not None:
+            model_params_dict["max_tokens"] = max_tokens
+
+        model = model_params_dict.pop("model", self.model_name)
+
+        # The context is sent as a separate message, so that the system prompt remains
+        # an identical prefix across requests and can benefit from prompt caching.
+        messages = [SystemMessage(content=system_prompt).dict()]
+        if context is not None:
+            messages.append(
+                SystemMessage(content=f"Context: {context.to_text()}").dict()
+            )
+        messages += [_message_dict(m) for m in chat_history]
+        return (model,
+                cast(List[ChatCompletionMessageParam], messages),
+                model_params_dict)
+
+    @staticmethod
+    def _parse_chat_response(response: Any) -> ChatResponse:
+        chat_response = ChatResponse.parse_obj(response)
+        details = getattr(getattr(response, "usage", None),
+                          "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None)
+        if cached_tokens is not None:
+            chat_response.debug_info["cached_prompt_tokens"] = cached_tokens
+        return chat_response
+
+    def _get_cache_key(self,
+                       model: str,
+                       messages: List[ChatCompletionMessageParam],
+                       model_params_dict: Dict[str, Any],
+                       **extra: Any,
+                       ) -> Optional[str]:
+        # Only deterministic requests are cached
+        if self._cache is None or model_params_dict.get("temperature", 1) != 0:
+            return None
+        # The provider and endpoint are part of the key, so that a cache shared by
+        # several LLMs never returns a response generated by another backend
+        return LLMCache.make_key(provider=self.__class__.__name__,
+                                 base_url=str(self._client.base_url),
+                                 model=model,
+                                 messages=messages,
+                                 params=sorted(model_params_dict.items()),
+                                 **extra)
+
+    @staticmethod
+    def _function_call_params(function: Function
+                              ) -> Tuple[Dict[str, Any], Validator]:
+        # Not sorting the keys keeps the properties in the order they were defined
+        return _get_function_call_params(orjson.dumps(function.dict()))
+
+    @staticmethod
+    def _parse_function_call(chat_completion: Any, validator: Validator) -> dict:
+        result = chat_completion.choices[0].message.tool_calls[0].function.arguments
+        arguments = orjson.loads(result)
+
+        validator.validate(arguments)
+        return arguments
 
     @staticmethod
     def _format_openai_error(e):
@@ -1,8 +1,8 @@
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Optional, List, Union, Dict, Literal
+from typing import Optional, List, Union, Dict, Literal, Any, Tuple
 
-from pydantic import BaseModel, Field, validator, Extra
+from pydantic import BaseModel, Field, validator, Extra, PrivateAttr
 
 Metadata = Dict[str, Union[str, int, float, List[str]]]
 
@@ -92,6 +92,9 @@ class MessageBase(BaseModel):
     role: Role = Field(description="The role of the message's author. "
                                    "Can be one of ['User', 'Assistant', 'System']")
     content: str = Field(description="The contents of the message.")
+    # Cached (role, content, serialized message) used by the LLMs when sending the
+    # chat history. Not part of the message's fields.
+    _serialized: Optional[Tuple[Role, str, Dict[str, Any]]] = PrivateAttr(default=None)
 
     def dict(self, *args, **kwargs):
         d = super().dict(*args, **kwargs)
@@ -1,10 +1,10 @@
 import os
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, AsyncMock, patch
 
 import jsonschema
 import pytest
 
-from canopy.llm import AzureOpenAILLM
+from canopy.llm import AzureOpenAILLM, LLMCache
 from canopy.models.data_models import Role, MessageBase, Context, StringContextContent  # noqa
 from canopy.models.api_models import ChatResponse, StreamingChatChunk # noqa
 from canopy.llm.openai import OpenAILLM  # noqa
@@ -33,6 +33,30 @@ def assert_function_call_format(result):
     assert len(result["queries"][0]) > 0
 
 
+def function_call_response(arguments):
+    return MagicMock(
+        choices=[MagicMock(
+            message=MagicMock(
+                tool_calls=[
+                    MagicMock(
+                        function=MagicMock(
+                            arguments=arguments))]))])
+
+
+@pytest.fixture
+def chat_completion_response():
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "test_model",
+        "choices": [{"index": 0,
+                     "message": {"role": "assistant", "content": "answer"},
+                     "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 1},
+    }
+
+
 @pytest.fixture
 def model_name():
     return "gpt-3.5-turbo-0613"
@@ -247,13 +271,8 @@ def test_enforce_function_wrong_output_schema(openai_llm,
                                               messages,
                                               function_query_knowledgebase):
     openai_llm._client = MagicMock()
-    openai_llm._client.chat.completions.create.return_value = MagicMock(
-        choices=[MagicMock(
-            message=MagicMock(
-                tool_calls=[
-                    MagicMock(
-                        function=MagicMock(
-                            arguments="{\"key\": \"value\"}"))]))])
+    openai_llm._client.chat.completions.create.return_value = \
+        function_call_response("{\"key\": \"value\"}")
 
     with pytest.raises(jsonschema.ValidationError,
                        match="'queries' is a required property"):
@@ -265,6 +284,153 @@ def test_enforce_function_wrong_output_schema(openai_llm,
         "retry did not happen as expected"
 
 
+@pytest.mark.asyncio
+async def test_achat_completion(openai_llm, messages):
+    response = await openai_llm.achat_completion(system_prompt=SYSTEM_PROMPT,
+                                                 chat_history=messages)
+    assert_chat_completion(response)
+
+
+@pytest.mark.asyncio
+async def test_achat_streaming(openai_llm, messages):
+    response = await openai_llm.achat_completion(system_prompt=SYSTEM_PROMPT,
+                                                 chat_history=messages,
+                                                 stream=True)
+    messages_received = [message async for message in response]
+    assert len(messages_received) > 0
+    for message in messages_received:
+        assert isinstance(message, StreamingChatChunk)
+
+
+@pytest.mark.asyncio
+async def test_aenforced_function_call(openai_llm,
+                                       messages,
+                                       function_query_knowledgebase):
+    result = await openai_llm.aenforced_function_call(
+        system_prompt=SYSTEM_PROMPT,
+        chat_history=messages,
+        function=function_query_knowledgebase)
+    assert_function_call_format(result)
+
+
+def test_chat_completion_context_in_separate_message(openai_llm,
+                                                     messages,
+                                                     chat_completion_response):
+    openai_llm._client = MagicMock()
+    openai_llm._client.chat.completions.create.return_value = \
+        chat_completion_response
+
+    openai_llm.chat_completion(system_prompt=SYSTEM_PROMPT,
+                               chat_history=messages,
+                               context=Context(
+                                   content=StringContextContent(
+                                       __root__="context from kb"
+                                   ),
+                                   num_tokens=5
+                               ))
+
+    sent_messages = openai_llm._client.chat.completions.create.call_args.kwargs[
+        "messages"]
+    assert sent_messages[0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert sent_messages[1] == {"role": "system",
+                                "content": "Context: context from kb"}
+    assert sent_messages[2:] == [m.dict() for m in messages]
+
+
+@pytest.mark.asyncio
+async def test_aenforce_function_wrong_output_schema(openai_llm,
+                                                     messages,
+                                                     function_query_knowledgebase):
+    async_client = MagicMock()
+    openai_llm._create_async_client = MagicMock(return_value=async_client)
+    async_client.chat.completions.create = AsyncMock(
+        return_value=function_call_response("{\"key\": \"value\"}"))
+
+    with pytest.raises(jsonschema.ValidationError,
+                       match="'queries' is a required property"):
+        await openai_llm.aenforced_function_call(
+            system_prompt=SYSTEM_PROMPT,
+            chat_history=messages,
+            function=function_query_knowledgebase)
+
+    assert async_client.chat.completions.create.call_count == 3, \
+        "retry did not happen as expected"
+
+
+def test_chat_completion_cached(openai_llm, messages, chat_completion_response):
+    openai_llm._cache = LLMCache()
+    openai_llm._client = MagicMock()
+    openai_llm._client.chat.completions.create.return_value = \
+        chat_completion_response
+
+    responses = [
+        openai_llm.chat_completion(system_prompt=SYSTEM_PROMPT,
+                                   chat_history=messages,
+                                   model_params={"temperature": 0})
+        for _ in range(2)
+    ]
+
+    assert openai_llm._client.chat.completions.create.call_count == 1
+    assert openai_llm._cache.stats == {"hits": 1, "misses": 1}
+    assert isinstance(responses[1], ChatResponse)
+    assert responses[0] == responses[1]
+
+
+def test_cache_not_shared_between_endpoints(messages, chat_completion_response):
+    cache = LLMCache()
+    llms = [OpenAILLM(cache=cache),
+            OpenAILLM(base_url="https://other.example.com/v1", cache=cache)]
+    for llm in llms:
+        with patch.object(llm._client.chat.completions, "create",
+                          return_value=chat_completion_response) as create:
+            llm.chat_completion(system_prompt=SYSTEM_PROMPT,
+                                chat_history=messages,
+                                model_params={"temperature": 0})
+        assert create.call_count == 1
+
+    assert cache.stats == {"hits": 0, "misses": 2}
+
+
+def test_enforced_function_call_cached(openai_llm,
+                                       messages,
+                                       function_query_knowledgebase):
+    openai_llm._cache = LLMCache()
+    openai_llm._client = MagicMock()
+    openai_llm._client.chat.completions.create.return_value = \
+        function_call_response("{\"queries\": [\"q\"]}")
+
+    for _ in range(2):
+        result = openai_llm.enforced_function_call(
+            system_prompt=SYSTEM_PROMPT,
+            chat_history=messages,
+            function=function_query_knowledgebase,
+            model_params={"temperature": 0})
+        assert result == {"queries": ["q"]}
+
+    assert openai_llm._client.chat.completions.create.call_count == 1
+    assert openai_llm._cache.stats == {"hits": 1, "misses": 1}
+
+
+def test_enforced_function_call_not_cached_with_temperature(
+        openai_llm,
+        messages,
+        function_query_knowledgebase):
+    openai_llm._cache = LLMCache()
+    openai_llm._client = MagicMock()
+    openai_llm._client.chat.completions.create.return_value = \
+        function_call_response("{\"queries\": [\"q\"]}")
+
+    for _ in range(2):
+        openai_llm.enforced_function_call(
+            system_prompt=SYSTEM_PROMPT,
+            chat_history=messages,
+            function=function_query_knowledgebase,
+            model_params={"temperature": 0.5})
+
+    assert openai_llm._client.chat.completions.create.call_count == 2
+    assert len(openai_llm._cache) == 0
+
+
 def test_available_models(openai_llm):
     if isinstance(openai_llm, AzureOpenAILLM):
         pytest.skip("Azure does not support listing models")
@@ -275,6 +441,17 @@ def test_available_models(openai_llm):
     assert openai_llm.model_name in models
 
 
+def test_available_models_cached(openai_llm):
+    if isinstance(openai_llm, AzureOpenAILLM):
+        pytest.skip("Azure does not support listing models")
+    openai_llm._client = MagicMock()
+    openai_llm._client.models.list.return_value = [MagicMock(id="test_model")]
+
+    assert openai_llm.available_models == ["test_model"]
+    assert openai_llm.available_models == ["test_model"]
+    assert openai_llm._client.models.list.call_count == 1
+
+
 @pytest.fixture()
 def no_api_key():
     before = os.environ.pop("OPENAI_API_KEY", None)
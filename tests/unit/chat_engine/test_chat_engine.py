@@ -132,6 +132,15 @@ class TestChatEngine:
 
         assert response == expected['response']
 
+    def test_chat_keeps_llm_debug_info(self, namespace):
+        chat_engine = self._init_chat_engine()
+        messages, expected = self._get_inputs_and_expected(5, 10, MOCK_SYSTEM_PROMPT)
+        expected['response'].debug_info["cached_prompt_tokens"] = 20
+
+        response = chat_engine.chat(messages, namespace=namespace)
+
+        assert response.debug_info["cached_prompt_tokens"] == 20
+
     @pytest.mark.parametrize("allow_model_params_override,params_override",
                              [("False", None),
                               ("False", {'temperature': 0.99, 'top_p': 0.5}),
@@ -37,9 +37,9 @@ def sample_messages():
         (50, 5, 33, SAMPLE_CONTEXT, None),
         (50, 5, 33, None, SYSTEM_PROMPT),
         (50, 5, 33, SAMPLE_CONTEXT, SYSTEM_PROMPT),
-        (11, 1, 6, SAMPLE_CONTEXT, None),
+        (15, 1, 6, SAMPLE_CONTEXT, None),
         (18, 1, 6, None, SYSTEM_PROMPT),
-        (19, 1, 6, SAMPLE_CONTEXT, SYSTEM_PROMPT),
+        (23, 1, 6, SAMPLE_CONTEXT, SYSTEM_PROMPT),
     ],
     ids=[
         "full_history_fit_no_context_no_prompt",
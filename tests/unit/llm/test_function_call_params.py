@@ -0,0 +1,52 @@
+import jsonschema
+import pytest
+
+from canopy.llm import OpenAILLM
+from canopy.llm.models import (Function, FunctionParameters, FunctionArrayProperty,
+                               FunctionPrimitiveProperty)
+
+
+def _function(description="Query search engine for relevant information"):
+    return Function(
+        name="query_knowledgebase",
+        description=description,
+        parameters=FunctionParameters(
+            required_properties=[
+                FunctionArrayProperty(name="queries",
+                                      items_type="string",
+                                      description="List of queries."),
+            ],
+            optional_properties=[
+                FunctionPrimitiveProperty(name="namespace", type="string"),
+            ]
+        ),
+    )
+
+
+def test_function_call_params_match_function():
+    function = _function()
+
+    tool_params, validator = OpenAILLM._function_call_params(function)
+
+    assert tool_params == {
+        "tools": [{"type": "function", "function": function.dict()}],
+        "tool_choice": {"type": "function",
+                        "function": {"name": "query_knowledgebase"}},
+    }
+    assert list(tool_params["tools"][0]["function"]["parameters"]["properties"]) \
+        == ["queries", "namespace"]
+    validator.validate({"queries": ["q"]})
+    with pytest.raises(jsonschema.ValidationError):
+        validator.validate({"namespace": "ns"})
+
+
+def test_function_call_params_shared_between_equal_functions():
+    tool_params, validator = OpenAILLM._function_call_params(_function())
+    other_params, other_validator = OpenAILLM._function_call_params(_function())
+
+    assert other_params is tool_params
+    assert other_validator is validator
+
+    changed_params, _ = OpenAILLM._function_call_params(_function("Other"))
+    assert changed_params is not tool_params
+    assert changed_params["tools"][0]["function"]["description"] == "Other"
@@ -0,0 +1,62 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import jsonschema
+import pytest
+
+from canopy.llm.openai import (FUNCTION_CALL_MAX_ATTEMPTS, _call_with_retry,
+                               _acall_with_retry)
+
+
+def test_retry_backoff_and_last_error_raised():
+    errors = [json.JSONDecodeError("bad json", "", 0),
+              jsonschema.ValidationError("first"),
+              jsonschema.ValidationError("last")]
+    attempt_fn = MagicMock(side_effect=errors)
+
+    with patch("canopy.llm.openai.time.sleep") as sleep:
+        with pytest.raises(jsonschema.ValidationError, match="last"):
+            _call_with_retry(attempt_fn)
+
+    assert attempt_fn.call_count == FUNCTION_CALL_MAX_ATTEMPTS
+    delays = [call.args[0] for call in sleep.call_args_list]
+    assert len(delays) == 2
+    assert 0 < delays[0] < delays[1]
+
+
+def test_retry_returns_after_transient_error():
+    attempt_fn = MagicMock(side_effect=[jsonschema.ValidationError("invalid"),
+                                        {"queries": ["q"]}])
+
+    with patch("canopy.llm.openai.time.sleep") as sleep:
+        assert _call_with_retry(attempt_fn) == {"queries": ["q"]}
+
+    assert attempt_fn.call_count == 2
+    assert sleep.call_count == 1
+
+
+def test_no_retry_on_other_errors():
+    attempt_fn = MagicMock(side_effect=RuntimeError("API call failed"))
+
+    with patch("canopy.llm.openai.time.sleep") as sleep:
+        with pytest.raises(RuntimeError, match="API call failed"):
+            _call_with_retry(attempt_fn)
+
+    assert attempt_fn.call_count == 1
+    sleep.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_async_retry_backoff_and_last_error_raised():
+    attempt_fn = AsyncMock(side_effect=[jsonschema.ValidationError("first"),
+                                        jsonschema.ValidationError("second"),
+                                        jsonschema.ValidationError("last")])
+
+    with patch("canopy.llm.openai.asyncio.sleep", new=AsyncMock()) as sleep:
+        with pytest.raises(jsonschema.ValidationError, match="last"):
+            await _acall_with_retry(attempt_fn)
+
+    assert attempt_fn.call_count == FUNCTION_CALL_MAX_ATTEMPTS
+    delays = [call.args[0] for call in sleep.await_args_list]
+    assert len(delays) == 2
+    assert 0 < delays[0] < delays[1]
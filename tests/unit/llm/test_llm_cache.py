@@ -0,0 +1,58 @@
+import pytest
+
+from canopy.llm.cache import LLMCache
+
+
+@pytest.fixture
+def cache():
+    return LLMCache(max_size=2)
+
+
+def test_get_missing_key(cache):
+    assert cache.get("missing") is None
+    assert cache.stats == {"hits": 0, "misses": 1}
+
+
+def test_set_and_get(cache):
+    cache.set("key", {"value": 1})
+    assert cache.get("key") == {"value": 1}
+    assert cache.stats == {"hits": 1, "misses": 0}
+
+
+def test_lru_eviction(cache):
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Touch "a" so "b" becomes the least recently used entry
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_expired_entry(cache):
+    cache.set("key", "value", ttl=-1)
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_clear(cache):
+    cache.set("key", "value")
+    cache.get("key")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats == {"hits": 0, "misses": 0}
+
+
+def test_make_key_is_order_independent():
+    key_1 = LLMCache.make_key(model="m", params={"a": 1, "b": 2})
+    key_2 = LLMCache.make_key(params={"b": 2, "a": 1}, model="m")
+    assert key_1 == key_2
+    assert key_1 != LLMCache.make_key(model="m", params={"a": 1, "b": 3})
+
+
+def test_invalid_max_size():
+    with pytest.raises(ValueError):
+        LLMCache(max_size=0)
@@ -0,0 +1,28 @@
+from canopy.llm.openai import _message_dict
+from canopy.models.data_models import UserMessage
+
+
+def test_message_dict_matches_dict():
+    message = UserMessage(content="Hello")
+    assert _message_dict(message) == message.dict()
+    assert _message_dict(message) == {"role": "user", "content": "Hello"}
+
+
+def test_message_dict_returns_copy():
+    message = UserMessage(content="Hello")
+    _message_dict(message)["content"] = "changed"
+    assert _message_dict(message)["content"] == "Hello"
+
+
+def test_message_dict_after_content_update():
+    message = UserMessage(content="Hello")
+    _message_dict(message)
+    message.content = "Goodbye"
+    assert _message_dict(message)["content"] == "Goodbye"
+
+
+def test_cache_not_part_of_message_fields():
+    message = UserMessage(content="Hello")
+    _message_dict(message)
+    assert message.dict() == {"role": "user", "content": "Hello"}
+    assert message == UserMessage(content="Hello")
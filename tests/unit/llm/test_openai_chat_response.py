@@ -0,0 +1,54 @@
+from unittest.mock import patch
+
+import pytest
+from openai.types.chat import ChatCompletion
+
+from canopy.llm import OpenAILLM
+from canopy.models.api_models import ChatResponse
+from canopy.models.data_models import UserMessage
+
+
+def _chat_completion(usage):
+    return ChatCompletion.parse_obj({
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "test_model",
+        "choices": [{"index": 0,
+                     "message": {"role": "assistant", "content": "answer"},
+                     "finish_reason": "stop"}],
+        "usage": usage,
+    })
+
+
+@pytest.fixture
+def llm():
+    return OpenAILLM(api_key="test_api_key")
+
+
+def test_cached_prompt_tokens_in_debug_info(llm):
+    completion = _chat_completion({"prompt_tokens": 1500,
+                                   "completion_tokens": 1,
+                                   "total_tokens": 1501,
+                                   "prompt_tokens_details": {"cached_tokens": 1024}})
+
+    with patch.object(llm._client.chat.completions, "create",
+                      return_value=completion):
+        response = llm.chat_completion(system_prompt="system prompt",
+                                       chat_history=[UserMessage(content="hi")])
+
+    assert isinstance(response, ChatResponse)
+    assert response.debug_info["cached_prompt_tokens"] == 1024
+
+
+def test_no_cached_prompt_tokens_reported(llm):
+    completion = _chat_completion({"prompt_tokens": 10,
+                                   "completion_tokens": 1,
+                                   "total_tokens": 11})
+
+    with patch.object(llm._client.chat.completions, "create",
+                      return_value=completion):
+        response = llm.chat_completion(system_prompt="system prompt",
+                                       chat_history=[UserMessage(content="hi")])
+
+    assert "cached_prompt_tokens" not in response.debug_info
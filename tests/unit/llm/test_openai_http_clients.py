@@ -0,0 +1,126 @@
+import asyncio
+import gc
+import json
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from canopy.llm import OpenAILLM, AnyscaleLLM
+from canopy.llm.openai import _async_http_clients
+
+
+@pytest.fixture
+def llms():
+    return OpenAILLM(api_key="test_api_key"), OpenAILLM(api_key="test_api_key")
+
+
+def test_http_client_shared_by_base_url(llms):
+    llm_1, llm_2 = llms
+    other_llm = AnyscaleLLM(api_key="test_api_key")
+
+    assert llm_1._client._client is llm_2._client._client
+    assert other_llm._client._client is not llm_1._client._client
+
+
+def test_closing_one_llm_keeps_shared_client_open(llms):
+    llm_1, llm_2 = llms
+
+    llm_1._client.close()
+    with llm_1._client:
+        pass
+
+    assert not llm_2._client._client.is_closed
+
+
+def test_closing_one_async_llm_keeps_shared_client_open(llms):
+    llm_1, llm_2 = llms
+
+    async def close_and_check():
+        await llm_1._async_client.close()
+        async with llm_1._async_client:
+            pass
+        return llm_2._async_client._client.is_closed
+
+    assert not asyncio.run(close_and_check())
+
+
+def test_async_client_resolved_per_event_loop(llms):
+    llm, _ = llms
+
+    async def get_clients():
+        return llm._async_client, llm._async_client
+
+    first_loop_clients = asyncio.run(get_clients())
+    second_loop_clients = asyncio.run(get_clients())
+
+    assert first_loop_clients[0] is first_loop_clients[1]
+    assert first_loop_clients[0] is not second_loop_clients[0]
+    assert first_loop_clients[0]._client is not second_loop_clients[0]._client
+
+
+def test_async_client_per_loop_in_threads(llms):
+    llm, _ = llms
+    clients = []
+
+    async def get_client():
+        clients.append(llm._async_client)
+
+    threads = [threading.Thread(target=asyncio.run, args=(get_client(),))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(clients) == 3
+    assert len({id(client) for client in clients}) == 3
+
+
+@pytest.fixture
+def models_server():
+    body = json.dumps({"object": "list", "data": [
+        {"id": "test_model", "object": "model", "created": 0, "owned_by": "test"}
+    ]}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_async_clients_of_closed_loops_are_released(models_server):
+    llm = OpenAILLM(api_key="test_api_key", base_url=models_server)
+    loops = []
+    http_clients = []
+
+    async def list_models():
+        loops.append(weakref.ref(asyncio.get_running_loop()))
+        http_clients.append(llm._async_client._client)
+        return await llm._async_client.models.list()
+
+    for _ in range(5):
+        assert asyncio.run(list_models()).data[0].id == "test_model"
+    gc.collect()
+
+    # The shared clients are closed when their loop shuts down, and the LLM drops
+    # the clients of closed loops the next time it is used
+    assert all(client.is_closed for client in http_clients)
+    assert not any(loop() in _async_http_clients for loop in loops)
+    assert [loop() is None for loop in loops] == [True] * 4 + [False]
+    assert list(llm._aclients) == [loops[-1]()]
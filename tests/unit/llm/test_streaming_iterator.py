@@ -0,0 +1,94 @@
+import pytest
+from openai.types.chat import ChatCompletionChunk
+
+from canopy.llm.openai import (_streaming_iterator, _astreaming_iterator,
+                               _parse_streaming_chunk)
+from canopy.models.api_models import StreamingChatChunk
+
+
+def _chunk(delta, finish_reason=None):
+    return ChatCompletionChunk.parse_obj({
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "test_model",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    })
+
+
+@pytest.fixture
+def chunks():
+    return [
+        _chunk({"role": "assistant", "content": ""}),
+        _chunk({"content": "Hello"}),
+        _chunk({"content": ", "}),
+        _chunk({"content": "world"}),
+        _chunk({}, finish_reason="stop"),
+    ]
+
+
+def test_parse_streaming_chunk_matches_validation(chunks):
+    for chunk in chunks:
+        parsed = _parse_streaming_chunk(chunk)
+        assert parsed == StreamingChatChunk.parse_obj(chunk)
+        assert parsed.json() == StreamingChatChunk.parse_obj(chunk).json()
+
+
+def test_no_coalescing_yields_every_chunk(chunks):
+    result = list(_streaming_iterator(chunks))
+    assert len(result) == len(chunks)
+    assert all(isinstance(chunk, StreamingChatChunk) for chunk in result)
+    assert [chunk.choices[0].delta.get("content") for chunk in result] == \
+        ["", "Hello", ", ", "world", None]
+
+
+def test_coalesce_ms_merges_chunks(chunks):
+    result = list(_streaming_iterator(chunks, coalesce_ms=60_000))
+    assert len(result) == 1
+    choice = result[0].choices[0]
+    assert choice.delta["role"] == "assistant"
+    assert choice.delta["content"] == "Hello, world"
+    assert choice.finish_reason == "stop"
+
+
+def test_coalesce_chars_flushes_when_full(chunks):
+    result = list(_streaming_iterator(chunks, coalesce_chars=5))
+    assert [chunk.choices[0].delta.get("content") for chunk in result] == \
+        ["Hello", ", world", None]
+    assert result[-1].choices[0].finish_reason == "stop"
+
+
+@pytest.mark.parametrize("coalesce_ms,coalesce_chars", [(60_000, 0), (0, 5)],
+                         ids=["single_flush", "finish_only_flush"])
+def test_coalesced_delta_keys_match_uncoalesced(chunks, coalesce_ms, coalesce_chars):
+    uncoalesced = list(_streaming_iterator(chunks))
+    coalesced = list(_streaming_iterator(chunks,
+                                         coalesce_ms=coalesce_ms,
+                                         coalesce_chars=coalesce_chars))
+    delta_keys = set(uncoalesced[0].choices[0].delta)
+    assert all(set(chunk.choices[0].delta) == delta_keys for chunk in uncoalesced)
+    assert all(set(chunk.choices[0].delta) == delta_keys for chunk in coalesced)
+    assert coalesced[-1].choices[0].finish_reason == "stop"
+
+
+def test_tool_call_chunks_are_not_merged(chunks):
+    tool_call = {"index": 0, "function": {"arguments": "{}"}}
+    tool_call_chunk = _chunk({"tool_calls": [tool_call]})
+    stream = chunks[:2] + [tool_call_chunk] + chunks[2:]
+    result = list(_streaming_iterator(stream, coalesce_ms=60_000))
+    assert len(result) == 3
+    assert result[0].choices[0].delta["content"] == "Hello"
+    assert result[1].choices[0].delta["tool_calls"] is not None
+    assert result[2].choices[0].delta["content"] == ", world"
+
+
+@pytest.mark.asyncio
+async def test_async_coalesce_ms_merges_chunks(chunks):
+    async def response():
+        for chunk in chunks:
+            yield chunk
+
+    result = [chunk async for chunk in _astreaming_iterator(response(),
+                                                            coalesce_ms=60_000)]
+    assert len(result) == 1
+    assert result[0].choices[0].delta["content"] == "Hello, world"